@@ -1,21 +1,44 @@
 import os
 import json
 import base64
+import functools
+import hashlib
+import io
 import uuid
 import csv
-import pandas as pd
+from urllib.request import urlopen
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, List, Optional
 
+# pydantic (which google-generativeai uses to convert response schemas) rejects
+# typing.TypedDict on Python < 3.12; the typing_extensions version works everywhere
+from typing_extensions import TypedDict
+
 import streamlit as st
 from dotenv import load_dotenv
 import google.generativeai as genai
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
 from google.auth.transport.requests import Request
 
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+except ImportError:  # orjson is optional; stdlib json keeps everything working
+    def _json_loads(data):
+        return json.loads(data)
+
+    def _json_dumps(obj, indent: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
 # ----------------------------
 # Config and setup
 # ----------------------------
@@ -43,11 +66,15 @@ if not GEMINI_API_KEY:
 # Configure Gemini API
 genai.configure(api_key=GEMINI_API_KEY)
 
+GEMINI_MODEL = "models/gemini-2.5-flash"
+TRANSCRIPT_CACHE_TTL = timedelta(minutes=15)
+
 # Session keys
 CREDS_KEY = "google_creds"
 USER_INFO_KEY = "user_info"
 STATE_KEY = "oauth_state"
 ACTION_ITEMS_KEY = "action_items"
+TRANSCRIPT_CACHE_KEY = "gemini_transcript_caches"
 
 # ----------------------------
 # Helpers
@@ -75,13 +102,26 @@ def decode_id_token_sub_name(id_token: Optional[str]) -> Dict[str, str]:
     if not id_token:
         return {"sub": "unknown", "name": "User"}
     try:
-        payload = id_token.split(".")[1] + "=="
-        data = json.loads(base64.urlsafe_b64decode(payload).decode("utf-8"))
+        payload = id_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        data = _json_loads(base64.urlsafe_b64decode(payload))
         return {"sub": data.get("sub", "unknown"), "name": data.get("name", "User")}
     except Exception:
         return {"sub": "unknown", "name": "User"}
 
 
+def user_info_for(creds: Credentials) -> Dict[str, str]:
+    """Decode the id token once per session; reruns reuse the session-state copy"""
+    # A missing token matches the absent "_id_token" key (None == None), so
+    # also require that the decoded info was actually stored.
+    if st.session_state.get("_id_token") == creds.id_token and USER_INFO_KEY in st.session_state:
+        return st.session_state[USER_INFO_KEY]
+    info = decode_id_token_sub_name(creds.id_token)
+    st.session_state[USER_INFO_KEY] = info
+    st.session_state["_id_token"] = creds.id_token
+    return info
+
+
 def ensure_creds() -> Optional[Credentials]:
     creds_dict = st.session_state.get(CREDS_KEY)
     if not creds_dict:
@@ -90,14 +130,37 @@ def ensure_creds() -> Optional[Credentials]:
     if not creds.valid and creds.refresh_token:
         try:
             creds.refresh(Request())
-            st.session_state[CREDS_KEY] = json.loads(creds.to_json())
+            st.session_state[CREDS_KEY] = _json_loads(creds.to_json())
         except Exception as e:
             st.warning(f"Token refresh failed: {e}")
             return None
     return creds
 
 
+DISCOVERY_DOC_PATH = "meet_v2_discovery.json"
+MEET_DISCOVERY_URL = "https://meet.googleapis.com/$discovery/rest?version=v2"
+
+
+@functools.lru_cache(maxsize=1)
+def meet_discovery_doc() -> Optional[str]:
+    """Fetch the Meet v2 discovery document once, backed by a local file cache"""
+    try:
+        if os.path.exists(DISCOVERY_DOC_PATH):
+            with open(DISCOVERY_DOC_PATH) as f:
+                return f.read()
+        with urlopen(MEET_DISCOVERY_URL) as resp:
+            doc = resp.read().decode("utf-8")
+        with open(DISCOVERY_DOC_PATH, "w") as f:
+            f.write(doc)
+        return doc
+    except Exception:
+        return None
+
+
 def meet_service(creds: Credentials):
+    doc = meet_discovery_doc()
+    if doc is not None:
+        return build_from_document(doc, credentials=creds)
     return build("meet", "v2", credentials=creds, cache_discovery=False)
 
 
@@ -115,116 +178,174 @@ def list_conference_records_by_time(svc, start_iso: str, end_iso: str) -> List[D
     return resp.get("conferenceRecords", [])
 
 
-def list_transcripts_for_record(svc, cr_name: str) -> List[Dict[str, Any]]:
-    t = svc.conferenceRecords().transcripts().list(parent=cr_name).execute()
+@st.cache_data(ttl=600, show_spinner=False)
+def list_transcripts_for_record(_svc, cr_name: str) -> List[Dict[str, Any]]:
+    t = _svc.conferenceRecords().transcripts().list(parent=cr_name).execute()
     return t.get("transcripts", [])
 
 
-def fetch_entries_for_transcript(svc, transcript_name: str) -> List[Dict[str, Any]]:
+ENTRY_FIELDS = "nextPageToken,transcriptEntries(startTime,endTime,text,speaker/displayName,speaker/obfuscatedExternalUserId)"
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_entries_for_transcript(_svc, transcript_name: str, version: str = "") -> List[Dict[str, Any]]:
+    # `version` (the transcript's endTime) is part of the cache key so a transcript
+    # that is still being written invalidates; `_svc` is excluded from hashing.
+    # Only the fields we render are requested, which cuts the JSON payload per page.
+    # Pages are token-chained, so they cannot be fanned out; instead the next page's
+    # request runs on a worker thread while the current page is being consumed.
     entries: List[Dict[str, Any]] = []
-    req = svc.conferenceRecords().transcripts().entries().list(parent=transcript_name, pageSize=100)
-    while True:
-        page = req.execute()
-        entries.extend(page.get("transcriptEntries", []))
-        token = page.get("nextPageToken")
-        if not token:
-            break
-        req = svc.conferenceRecords().transcripts().entries().list(parent=transcript_name, pageToken=token, pageSize=100)
+    entries_api = _svc.conferenceRecords().transcripts().entries()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        req = entries_api.list(parent=transcript_name, pageSize=100, fields=ENTRY_FIELDS)
+        future = pool.submit(req.execute)
+        while req is not None:
+            page = future.result()
+            req = entries_api.list_next(previous_request=req, previous_response=page)
+            if req is not None:
+                future = pool.submit(req.execute)
+            entries.extend(page.get("transcriptEntries", []))
     return entries
 
 
+_EMPTY: Dict[str, Any] = {}
+
+
 def normalize_entry(e: Dict[str, Any]) -> Dict[str, Any]:
+    # Bind the speaker sub-dict once; the old double .get("speaker", {}) chain
+    # allocated a fresh default dict per lookup, per entry.
+    sp = e.get("speaker") or _EMPTY
     return {
         "startTime": e.get("startTime"),
         "endTime": e.get("endTime"),
-        "speaker": e.get("speaker", {}).get("displayName")
-                    or e.get("speaker", {}).get("obfuscatedExternalUserId")
-                    or "Speaker",
+        "speaker": sp.get("displayName") or sp.get("obfuscatedExternalUserId") or "Speaker",
         "text": e.get("text", ""),
     }
 
 
+@st.cache_data(ttl=600, show_spinner=False)
+def load_transcript(_svc, transcript_name: str, version: str = ""):
+    """Fetch, normalize, and summarize a transcript in a single cached pass.
+
+    Streamlit reruns the whole script on every widget click; caching here keeps
+    normalization and the summary stats from being recomputed each rerun.
+    """
+    raw_entries = fetch_entries_for_transcript(_svc, transcript_name, version)
+    entries = [normalize_entry(e) for e in raw_entries]
+
+    if len(entries) > 1000:
+        # Hours-long meetings produce tens of thousands of entries; summing the
+        # text lengths through NumPy's C loop beats the interpreter loop there.
+        # Below that size the dispatch overhead isn't worth it.
+        import numpy as np
+
+        lens = np.fromiter((len(e["text"]) for e in entries), dtype=np.int32, count=len(entries))
+        total_chars = int(lens.sum())
+        speakers = {e["speaker"] for e in entries}
+    else:
+        total_chars = 0
+        speakers = set()
+        for e in entries:
+            total_chars += len(e["text"])
+            speakers.add(e["speaker"])
+
+    return entries, total_chars, sorted(speakers)
+
+
 def as_text(entries: List[Dict[str, Any]]) -> str:
-    lines = []
-    for e in entries:
-        lines.append(f"[{e.get('startTime','')}] {e.get('speaker','Speaker')}: {e.get('text','')}")
-    return "\n".join(lines)
+    # Entries are already normalized, so the keys are guaranteed present
+    return "\n".join(f"[{e['startTime'] or ''}] {e['speaker']}: {e['text']}" for e in entries)
 
 
 # ----------------------------
 # Action Item Extraction
 # ----------------------------
 
-def extract_action_items(transcript_text: str) -> List[Dict[str, Any]]:
-    """Extract action items from transcript using Gemini API"""
+class ActionItem(TypedDict):
+    """Schema enforced on Gemini's structured JSON output"""
+    task: str
+    assignee: str
+    deadline: str
+    priority: str
+    context: str
+
+
+def get_transcript_model(transcript_text: str):
+    """Return a model bound to a server-side cache of the transcript, creating the cache on first use.
+
+    The transcript is uploaded once via Gemini explicit context caching; re-runs of
+    extraction (and any future summarize/Q&A features) reuse the cached tokens instead
+    of re-sending the full transcript on every call. Returns None if the transcript
+    cannot be cached (e.g. too short for the caching minimum).
+    """
+    digest = hashlib.sha256(transcript_text.encode("utf-8")).hexdigest()
+    caches = st.session_state.setdefault(TRANSCRIPT_CACHE_KEY, {})
+    cache_name = caches.get(digest)
+    if cache_name:
+        try:
+            cached = genai.caching.CachedContent.get(cache_name)
+            return genai.GenerativeModel.from_cached_content(cached)
+        except Exception:
+            # Cache expired or was evicted server-side; recreate below
+            caches.pop(digest, None)
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        prompt = f"""
-Analyze the following meeting transcript and extract all action items, tasks, and follow-up items mentioned.
+        cached = genai.caching.CachedContent.create(
+            model=GEMINI_MODEL,
+            contents=[transcript_text],
+            ttl=TRANSCRIPT_CACHE_TTL,
+        )
+        caches[digest] = cached.name
+        return genai.GenerativeModel.from_cached_content(cached)
+    except Exception:
+        return None
+
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=64)
+def extract_action_items(transcript_text: str) -> List[Dict[str, Any]]:
+    """Extract action items from transcript using Gemini API.
+
+    Errors propagate to the caller so a transient API failure is never
+    memoized as an empty result for the cache's lifetime.
+    """
+    instructions = """
+Analyze the meeting transcript provided and extract all action items, tasks, and follow-up items mentioned.
 
 For each action item, identify:
 1. The task description
-2. The person responsible (if mentioned)
-3. Any deadline or timeline mentioned
+2. The person responsible (use 'Unassigned' if not mentioned)
+3. Any deadline or timeline mentioned (use 'No deadline' if not mentioned)
 4. Priority level (High/Medium/Low)
-
-Return the results in JSON format with this structure:
-{{
-  "action_items": [
-    {{
-      "id": "unique_id",
-      "task": "description of the task",
-      "assignee": "person responsible (or 'Unassigned' if not mentioned)",
-      "deadline": "deadline if mentioned (or 'No deadline')",
-      "priority": "High/Medium/Low",
-      "context": "relevant context from the meeting"
-    }}
-  ]
-}}
-
-Transcript:
-{transcript_text}
+5. Relevant context from the meeting
 
 Please be thorough and extract all actionable items, even if they seem minor. Include tasks that were delegated, follow-ups that were mentioned, or decisions that require action.
 """
-        
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Try to extract JSON from the response
-        if "```json" in response_text:
-            json_start = response_text.find("```json") + 7
-            json_end = response_text.find("```", json_start)
-            json_text = response_text[json_start:json_end].strip()
-        elif "{" in response_text and "}" in response_text:
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            json_text = response_text[json_start:json_end]
-        else:
-            # Fallback: create a single action item with the raw response
-            return [{
-                "id": str(uuid.uuid4()),
-                "task": "Review meeting transcript for action items",
-                "assignee": "Unassigned",
-                "deadline": "No deadline",
-                "priority": "Medium",
-                "context": response_text[:200] + "..." if len(response_text) > 200 else response_text
-            }]
-        
-        result = json.loads(json_text)
-        action_items = result.get("action_items", [])
-        
-        # Add unique IDs if not present
-        for item in action_items:
-            if "id" not in item:
-                item["id"] = str(uuid.uuid4())
-        
-        return action_items
-        
-    except Exception as e:
-        st.error(f"Error extracting action items: {str(e)}")
-        return []
+
+    generation_config = genai.GenerationConfig(
+        response_mime_type="application/json",
+        response_schema=list[ActionItem],
+    )
+
+    model = get_transcript_model(transcript_text)
+    if model is not None:
+        # Transcript lives in the server-side cache; send only the instructions
+        prompt = instructions
+    else:
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        prompt = f"{instructions}\n\nTranscript:\n{transcript_text}"
+
+    # Stream so parsing can start as soon as the last chunk lands instead of
+    # blocking on the full response object
+    response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+    response_text = "".join(chunk.text for chunk in response).strip()
+
+    # The response schema guarantees a JSON list of action items
+    action_items = _json_loads(response_text)
+
+    # Add unique IDs (the schema intentionally omits them)
+    for item in action_items:
+        item["id"] = str(uuid.uuid4())
+
+    return action_items
 
 
 # ----------------------------
@@ -232,103 +353,166 @@ Please be thorough and extract all actionable items, even if they seem minor. In
 # ----------------------------
 
 CSV_FILE_PATH = "action_items.csv"
+CSV_FIELDS = ['id', 'task', 'assignee', 'deadline', 'priority', 'context', 'status', 'created_date']
+# Pre-baked header-only file for the clear-all fast path
+_EMPTY_CSV = (",".join(CSV_FIELDS) + "\n").encode("utf-8")
+
+# Canonical Kanban columns; the frozenset backs row-validity checks
+_STATUSES = ('todo', 'in_progress', 'done')
+_STATUS_SET = frozenset(_STATUSES)
+
+def _csv_row(item: Dict[str, Any], status: str, created: str) -> Dict[str, Any]:
+    return {
+        'id': item['id'],
+        'task': item['task'],
+        'assignee': item['assignee'],
+        'deadline': item['deadline'],
+        'priority': item['priority'],
+        'context': item['context'],
+        'status': status,
+        'created_date': created,
+    }
 
-def save_action_items_to_csv(action_items: Dict[str, List[Dict[str, Any]]]):
-    """Save action items to CSV file"""
+def _board_hash(action_items: Dict[str, Dict[str, Dict[str, Any]]]) -> int:
+    # Items are immutable once created, so the id sets per column fully
+    # describe the board's contents.
+    return hash(tuple((s, tuple(items)) for s, items in action_items.items()))
+
+def save_action_items_to_csv(action_items: Dict[str, Dict[str, Dict[str, Any]]]):
+    """Rewrite the CSV file from the full in-memory board (moves/deletes)"""
     try:
-        # Flatten the action items for CSV storage
-        csv_data = []
-        for status, items in action_items.items():
-            for item in items:
-                csv_data.append({
-                    'id': item['id'],
-                    'task': item['task'],
-                    'assignee': item['assignee'],
-                    'deadline': item['deadline'],
-                    'priority': item['priority'],
-                    'context': item['context'],
-                    'status': status,
-                    'created_date': datetime.now().isoformat()
-                })
-        
-        # Write to CSV
-        if csv_data:
-            df = pd.DataFrame(csv_data)
-            df.to_csv(CSV_FILE_PATH, index=False)
-            return True
+        created = datetime.now().isoformat()
+        with open(CSV_FILE_PATH, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for status, items in action_items.items():
+                for item in items.values():
+                    writer.writerow(_csv_row(item, status, created))
+        return True
+    except Exception as e:
+        st.error(f"Error saving to CSV: {str(e)}")
         return False
+
+def append_action_items_to_csv(items: List[Dict[str, Any]], status: str):
+    """Append newly added items without rewriting the whole file"""
+    try:
+        write_header = not os.path.exists(CSV_FILE_PATH) or os.path.getsize(CSV_FILE_PATH) == 0
+        created = datetime.now().isoformat()
+        with open(CSV_FILE_PATH, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if write_header:
+                writer.writeheader()
+            for item in items:
+                writer.writerow(_csv_row(item, status, created))
+        # Disk matches the board again; refresh the hash the deferred flush
+        # compares against, or a later mutation that nets back to this
+        # membership would wrongly skip its save and leave stale rows behind.
+        if ACTION_ITEMS_KEY in st.session_state:
+            st.session_state["_items_hash"] = _board_hash(st.session_state[ACTION_ITEMS_KEY])
+        return True
     except Exception as e:
         st.error(f"Error saving to CSV: {str(e)}")
         return False
 
-def load_action_items_from_csv() -> Dict[str, List[Dict[str, Any]]]:
+def load_action_items_from_csv() -> Dict[str, Dict[str, Dict[str, Any]]]:
     """Load action items from CSV file"""
     try:
+        action_items = {s: {} for s in _STATUSES}
         if not os.path.exists(CSV_FILE_PATH):
-            return {"todo": [], "in_progress": [], "done": []}
-        
-        df = pd.read_csv(CSV_FILE_PATH)
-        action_items = {"todo": [], "in_progress": [], "done": []}
-        
-        for _, row in df.iterrows():
-            item = {
-                'id': row['id'],
-                'task': row['task'],
-                'assignee': row['assignee'],
-                'deadline': row['deadline'],
-                'priority': row['priority'],
-                'context': row['context']
-            }
-            status = row['status']
-            if status in action_items:
-                action_items[status].append(item)
-        
+            return action_items
+
+        with open(CSV_FILE_PATH, newline='') as f:
+            for row in csv.DictReader(f):
+                status = row.pop('status', None)
+                row.pop('created_date', None)
+                if status in _STATUS_SET:
+                    action_items[status][row['id']] = row
+
         return action_items
     except Exception as e:
         st.warning(f"Error loading from CSV: {str(e)}")
-        return {"todo": [], "in_progress": [], "done": []}
-
-def initialize_action_items() -> Dict[str, List[Dict[str, Any]]]:
+        return {s: {} for s in _STATUSES}
+
+def build_action_items_csv(action_items: Dict[str, Dict[str, Dict[str, Any]]]) -> bytes:
+    """Serialize the board to CSV bytes for download.
+
+    Not cached: repeats are served from the session-state blob keyed on the
+    board fingerprint, and a global cache entry per board state would both
+    grow unbounded and freeze created_date at the first serialization.
+    """
+    created = datetime.now().isoformat()
+    # Rows are encoded straight into the byte buffer as they are written, so
+    # there is no full-text intermediate that then gets encoded a second time.
+    buf = io.BytesIO()
+    text = io.TextIOWrapper(buf, encoding='utf-8', newline='', write_through=True)
+    writer = csv.DictWriter(text, fieldnames=CSV_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    for status, items in action_items.items():
+        for item in items.values():
+            writer.writerow(_csv_row(item, status, created))
+    text.detach()
+    return buf.getvalue()
+
+def build_action_items_jsonl(action_items: Dict[str, Dict[str, Dict[str, Any]]], transcript_name: str, extraction_date: str) -> bytes:
+    """Serialize the board as JSON Lines: meeting info first, then one record per item.
+
+    Line-delimited output is written record-at-a-time, so peak memory stays at
+    one record instead of one fully pretty-printed document. Not cached: the
+    timestamp argument would make every call a miss, and the prepared blob is
+    already memoized in session state.
+    """
+    buf = io.BytesIO()
+    meeting_info = {
+        "transcript_name": transcript_name,
+        "extraction_date": extraction_date,
+        "total_items": sum(map(len, action_items.values())),
+    }
+    buf.write(_json_dumps({"meeting_info": meeting_info}) + b"\n")
+    for status, items in action_items.items():
+        for item in items.values():
+            buf.write(_json_dumps({"status": status, **item}) + b"\n")
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False)
+def _load_action_items_cached(csv_mtime: float) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    # The file's mtime is the cache key, so the CSV is only re-parsed when it
+    # actually changed on disk; new sessions otherwise reuse the cached parse.
+    return load_action_items_from_csv()
+
+def initialize_action_items() -> Dict[str, Dict[str, Dict[str, Any]]]:
     """Initialize the action items structure"""
     if ACTION_ITEMS_KEY not in st.session_state:
         # Try to load from CSV first
-        action_items = load_action_items_from_csv()
-        st.session_state[ACTION_ITEMS_KEY] = action_items
+        try:
+            csv_mtime = os.stat(CSV_FILE_PATH).st_mtime
+        except OSError:
+            csv_mtime = 0.0
+        st.session_state[ACTION_ITEMS_KEY] = _load_action_items_cached(csv_mtime)
     return st.session_state[ACTION_ITEMS_KEY]
 
 
 def move_action_item(item_id: str, from_status: str, to_status: str):
     """Move an action item between statuses"""
     action_items = st.session_state[ACTION_ITEMS_KEY]
-    
-    # Find and remove the item from the source status
-    item_to_move = None
-    for i, item in enumerate(action_items[from_status]):
-        if item["id"] == item_id:
-            item_to_move = action_items[from_status].pop(i)
-            break
-    
-    # Add to the target status
+
+    # O(1) re-keying between status buckets
+    item_to_move = action_items[from_status].pop(item_id, None)
     if item_to_move:
-        action_items[to_status].append(item_to_move)
+        action_items[to_status][item_id] = item_to_move
         st.session_state[ACTION_ITEMS_KEY] = action_items
-        # Save to CSV
-        save_action_items_to_csv(action_items)
+        # Persisted by the end-of-script flush
+        st.session_state["_dirty"] = True
         st.rerun()
 
 
 def delete_action_item(item_id: str, status: str):
     """Delete an action item"""
     action_items = st.session_state[ACTION_ITEMS_KEY]
-    
-    for i, item in enumerate(action_items[status]):
-        if item["id"] == item_id:
-            action_items[status].pop(i)
-            break
-    
+    action_items[status].pop(item_id, None)
+
     st.session_state[ACTION_ITEMS_KEY] = action_items
-    # Save to CSV
-    save_action_items_to_csv(action_items)
+    # Persisted by the end-of-script flush
+    st.session_state["_dirty"] = True
     st.rerun()
 
 
@@ -345,12 +529,28 @@ def add_action_item(task: str, assignee: str = "Unassigned", priority: str = "Me
         "context": "Manually added"
     }
     
-    action_items["todo"].append(new_item)
+    action_items["todo"][new_item["id"]] = new_item
     st.session_state[ACTION_ITEMS_KEY] = action_items
-    # Save to CSV
-    save_action_items_to_csv(action_items)
+    # Append just the new row to CSV
+    append_action_items_to_csv([new_item], "todo")
     st.rerun()
 
+# Static HTML blocks hoisted to constants so reruns pass a reference instead
+# of re-creating the multi-line literals each time
+_EMPTY_STATE_HTML = """
+<div style="text-align: center; padding: 2rem; color: #666;">
+    <h3 style="color: #999; margin-bottom: 1rem;">🔍 Ready to Analyze Your Meeting?</h3>
+    <p style="font-size: 1.1rem; margin-bottom: 0;">Search for a meeting above to view transcripts and extract action items</p>
+</div>
+"""
+
+_FOOTER_HTML = """
+<div style="text-align: center; padding: 1rem; color: #666; font-size: 0.9rem;">
+    <p style="margin: 0;">ℹ️ Transcripts are available only if the host enabled transcription and your account has permission to view the artifact.</p>
+    <p style="margin: 0.5rem 0 0 0;">🔒 This app uses read-only Meet scopes • No meeting bot required • Secure OAuth authentication</p>
+</div>
+"""
+
 # ----------------------------
 # UI - Auth
 # ----------------------------
@@ -368,7 +568,7 @@ st.markdown("""
 connected = False
 creds = ensure_creds()
 if creds:
-    info = decode_id_token_sub_name(creds.id_token)
+    info = user_info_for(creds)
     st.success(f"✅ Connected as **{info.get('name','User')}**")
     connected = True
 else:
@@ -382,8 +582,8 @@ else:
         try:
             flow.fetch_token(code=code)
             creds = flow.credentials
-            st.session_state[CREDS_KEY] = json.loads(creds.to_json())
-            info = decode_id_token_sub_name(creds.id_token)
+            st.session_state[CREDS_KEY] = _json_loads(creds.to_json())
+            info = user_info_for(creds)
             st.success(f"✅ Connected as **{info.get('name','User')}**")
             connected = True
         except Exception as e:
@@ -486,19 +686,16 @@ if records:
     st.markdown("---")
     st.markdown("### 📋 Meeting Records")
     
-    options = []
-    for r in records:
-        name = r.get("name")
+    def record_label(r):
         # The space field contains a space ID string, not a dictionary
         space_id = r.get("space", "")
         summary = space_id.split("/")[-1] if space_id else ""
         start = r.get("startTime", "").replace("T", " ").replace("Z", " UTC")
         end = r.get("endTime", "").replace("T", " ").replace("Z", " UTC")
-        options.append((f"{summary} - {start} to {end}", name))
+        return f"{summary} - {start} to {end}"
 
-    labels = [o[0] for o in options]
-    selected = st.selectbox("Select a meeting", labels, index=0)
-    cr_name = dict(options)[selected]
+    selected_record = st.selectbox("Select a meeting", records, index=0, format_func=record_label)
+    cr_name = selected_record["name"]
 
     with st.spinner("Loading transcripts..."):
         transcripts = list_transcripts_for_record(svc, cr_name)
@@ -508,13 +705,17 @@ if records:
     else:
         # Sort by createTime if available
         transcripts_sorted = sorted(transcripts, key=lambda t: t.get("createTime", ""))
-        t_labels = [f"{i+1}. {t.get('name')}" for i, t in enumerate(transcripts_sorted)]
-        t_selected = st.selectbox("Select a transcript", t_labels, index=len(t_labels)-1)
-        t_name = transcripts_sorted[t_labels.index(t_selected)]["name"]
+        t_index = st.selectbox(
+            "Select a transcript",
+            range(len(transcripts_sorted)),
+            index=len(transcripts_sorted) - 1,
+            format_func=lambda i: f"{i+1}. {transcripts_sorted[i].get('name')}",
+        )
+        t_record = transcripts_sorted[t_index]
+        t_name = t_record["name"]
 
         with st.spinner("Loading transcript content..."):
-            raw_entries = fetch_entries_for_transcript(svc, t_name)
-        entries = [normalize_entry(e) for e in raw_entries]
+            entries, total_chars, unique_speakers = load_transcript(svc, t_name, t_record.get("endTime", ""))
 
         if not entries:
             st.warning("⚠️ Transcript has no entries.")
@@ -523,9 +724,6 @@ if records:
             st.markdown("---")
             st.markdown("### 📊 Transcript Summary")
             
-            # Calculate stats
-            total_chars = sum(len(e["text"]) for e in entries)
-            unique_speakers = sorted(set(e["speaker"] for e in entries))
             duration_minutes = len(entries) * 0.5  # Rough estimate
             
             # Display summary in columns
@@ -576,16 +774,21 @@ if records:
             # Handle action item extraction
             if st.session_state.get("extract_action_items", False):
                 with st.spinner("🤖 Analyzing transcript with Gemini AI..."):
-                    extracted_items = extract_action_items(txt)
+                    try:
+                        extracted_items = extract_action_items(txt)
+                    except Exception as e:
+                        # Failures aren't cached, so the next click retries
+                        st.error(f"Error extracting action items: {str(e)}")
+                        extracted_items = None
                     if extracted_items:
                         # Add extracted items to todo column
                         for item in extracted_items:
-                            action_items["todo"].append(item)
+                            action_items["todo"][item["id"]] = item
                         st.session_state[ACTION_ITEMS_KEY] = action_items
-                        # Save to CSV
-                        save_action_items_to_csv(action_items)
+                        # Append just the new rows to CSV
+                        append_action_items_to_csv(extracted_items, "todo")
                         st.success(f"✅ Extracted {len(extracted_items)} action items!")
-                    else:
+                    elif extracted_items is not None:
                         st.warning("⚠️ No action items found in the transcript.")
                 st.session_state["extract_action_items"] = False
                 st.rerun()
@@ -610,9 +813,9 @@ if records:
                                 "priority": priority,
                                 "context": "Manually added"
                             }
-                            action_items["todo"].append(new_item)
+                            action_items["todo"][new_item["id"]] = new_item
                             st.session_state[ACTION_ITEMS_KEY] = action_items
-                            save_action_items_to_csv(action_items)
+                            append_action_items_to_csv([new_item], "todo")
                             st.success("✅ Action item added!")
                             st.rerun()
             
@@ -620,7 +823,7 @@ if records:
             st.markdown("#### 📋 Kanban Board")
             
             # Show summary stats
-            total_items = sum(len(items) for items in action_items.values())
+            total_items = sum(map(len, action_items.values()))
             if total_items > 0:
                 col1, col2, col3, col4 = st.columns(4)
                 with col1:
@@ -634,15 +837,23 @@ if records:
             
             # Create three columns for the kanban board
             col1, col2, col3 = st.columns(3)
-            
-            def render_action_item_card(item, status, show_context=True):
-                """Render a compact action item card"""
+
+            KANBAN_PAGE_SIZE = 10
+
+            def render_card_html(item, show_context=True):
+                """Build one action item card as an HTML string (no Streamlit elements)"""
                 priority_colors = {"High": "🔴", "Medium": "🟡", "Low": "🟢"}
                 priority_icon = priority_colors.get(item['priority'], "⚪")
-                
-                with st.container():
-                    # Card styling
-                    st.markdown(f"""
+
+                context_html = ""
+                if show_context and item['context'] != 'Manually added':
+                    context_html = f"""
+                        <details style="font-size: 0.9em; color: #666; margin-top: 4px;">
+                            <summary>📝 Context</summary>
+                            {item['context']}
+                        </details>"""
+
+                return f"""
                     <div style="
                         border: 1px solid #e0e0e0;
                         border-radius: 8px;
@@ -657,187 +868,217 @@ if records:
                         </div>
                         <div style="font-size: 0.9em; color: #666;">
                             📅 {item['deadline']}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # Context expander
-                    if show_context and item['context'] != 'Manually added':
-                        with st.expander("📝 Context", expanded=False):
-                            st.markdown(item['context'])
-                    
-                    # Action buttons
-                    if status == "todo":
-                        col_move, col_del = st.columns(2)
-                        with col_move:
-                            if st.button("→ In Progress", key=f"move_todo_{item['id']}", use_container_width=True):
-                                move_action_item(item['id'], 'todo', 'in_progress')
-                        with col_del:
-                            if st.button("🗑️", key=f"del_todo_{item['id']}", use_container_width=True):
-                                delete_action_item(item['id'], 'todo')
-                    elif status == "in_progress":
-                        col_left, col_right, col_del = st.columns(3)
-                        with col_left:
-                            if st.button("←", key=f"move_back_{item['id']}", use_container_width=True):
-                                move_action_item(item['id'], 'in_progress', 'todo')
-                        with col_right:
-                            if st.button("→", key=f"move_done_{item['id']}", use_container_width=True):
-                                move_action_item(item['id'], 'in_progress', 'done')
-                        with col_del:
-                            if st.button("🗑️", key=f"del_progress_{item['id']}", use_container_width=True):
-                                delete_action_item(item['id'], 'in_progress')
-                    elif status == "done":
-                        col_move, col_del = st.columns(2)
-                        with col_move:
-                            if st.button("←", key=f"move_back_done_{item['id']}", use_container_width=True):
-                                move_action_item(item['id'], 'done', 'in_progress')
-                        with col_del:
-                            if st.button("🗑️", key=f"del_done_{item['id']}", use_container_width=True):
-                                delete_action_item(item['id'], 'done')
+                        </div>{context_html}
+                    </div>"""
+
+            def render_card_actions(item, status):
+                """Render the interactive buttons for one card (these must stay real widgets)"""
+                if status == "todo":
+                    col_move, col_del = st.columns(2)
+                    with col_move:
+                        if st.button("→ In Progress", key=f"move_todo_{item['id']}", use_container_width=True):
+                            move_action_item(item['id'], 'todo', 'in_progress')
+                    with col_del:
+                        if st.button("🗑️", key=f"del_todo_{item['id']}", use_container_width=True):
+                            delete_action_item(item['id'], 'todo')
+                elif status == "in_progress":
+                    col_left, col_right, col_del = st.columns(3)
+                    with col_left:
+                        if st.button("←", key=f"move_back_{item['id']}", use_container_width=True):
+                            move_action_item(item['id'], 'in_progress', 'todo')
+                    with col_right:
+                        if st.button("→", key=f"move_done_{item['id']}", use_container_width=True):
+                            move_action_item(item['id'], 'in_progress', 'done')
+                    with col_del:
+                        if st.button("🗑️", key=f"del_progress_{item['id']}", use_container_width=True):
+                            delete_action_item(item['id'], 'in_progress')
+                elif status == "done":
+                    col_move, col_del = st.columns(2)
+                    with col_move:
+                        if st.button("←", key=f"move_back_done_{item['id']}", use_container_width=True):
+                            move_action_item(item['id'], 'done', 'in_progress')
+                    with col_del:
+                        if st.button("🗑️", key=f"del_done_{item['id']}", use_container_width=True):
+                            delete_action_item(item['id'], 'done')
             
+            def render_kanban_column(status, items, empty_message):
+                """Render one column, paginated so large boards don't emit hundreds of widgets"""
+                if not items:
+                    st.info(empty_message)
+                    return
+                page = 1
+                total_pages = -(-len(items) // KANBAN_PAGE_SIZE)
+                if total_pages > 1:
+                    page = st.number_input(
+                        f"Page (of {total_pages})",
+                        min_value=1,
+                        max_value=total_pages,
+                        key=f"page_{status}",
+                    )
+                    # The keyed widget can return a stale page after the column
+                    # shrinks (e.g. deleting the last card on the final page)
+                    page = min(page, total_pages)
+                page_items = items[(page - 1) * KANBAN_PAGE_SIZE : page * KANBAN_PAGE_SIZE]
+                # One markdown element for the whole column instead of one per card
+                st.markdown(
+                    "\n".join(render_card_html(item) for item in page_items),
+                    unsafe_allow_html=True,
+                )
+                for item in page_items:
+                    render_card_actions(item, status)
+
             with col1:
                 st.markdown("#### 🔴 To Do")
-                todo_items = action_items["todo"]
-                if not todo_items:
-                    st.info("No items in To Do")
-                else:
-                    for item in todo_items:
-                        render_action_item_card(item, "todo")
-            
+                render_kanban_column("todo", list(action_items["todo"].values()), "No items in To Do")
+
             with col2:
                 st.markdown("#### 🟡 In Progress")
-                in_progress_items = action_items["in_progress"]
-                if not in_progress_items:
-                    st.info("No items in Progress")
-                else:
-                    for item in in_progress_items:
-                        render_action_item_card(item, "in_progress")
-            
+                render_kanban_column("in_progress", list(action_items["in_progress"].values()), "No items in Progress")
+
             with col3:
                 st.markdown("#### 🟢 Done")
-                done_items = action_items["done"]
-                if not done_items:
-                    st.info("No completed items")
-                else:
-                    for item in done_items:
-                        render_action_item_card(item, "done")
+                render_kanban_column("done", list(action_items["done"].values()), "No completed items")
             
             # Export and Management Section
             if any(action_items.values()):
-                st.markdown("---")
-                st.markdown("#### 📤 Export & Management")
-                
-                col1, col2, col3 = st.columns(3)
+                @st.fragment
+                def render_export_panel(action_items, t_name):
+                    """Export/clear controls; interactions here rerun only this fragment"""
+                    st.markdown("#### 📤 Export & Management")
+
+                    # One clock read feeds both download filenames and the JSONL metadata
+                    export_now = datetime.now()
+                    export_ts = export_now.strftime('%Y%m%d_%H%M%S')
+                    # Cheap board fingerprint (membership per column); edits only ever
+                    # add, move, or delete items, so the id sets capture every change
+                    board_key = tuple((s, tuple(items)) for s, items in action_items.items())
+
+                    col1, col2, col3 = st.columns(3)
+
+                    with col1:
+                        # Payloads are only serialized when the user asks for them;
+                        # a stale blob (fingerprint mismatch) needs a fresh prepare
+                        if st.button("📊 Prepare CSV", use_container_width=True, help="Build the CSV export"):
+                            st.session_state["_csv_blob"] = build_action_items_csv(action_items)
+                            st.session_state["_csv_blob_key"] = board_key
+                        if st.session_state.get("_csv_blob_key") == board_key:
+                            st.download_button(
+                                "📊 Export CSV",
+                                data=st.session_state["_csv_blob"],
+                                file_name=f"action_items_{export_ts}.csv",
+                                mime="text/csv",
+                                use_container_width=True,
+                                help="Download all action items as CSV"
+                            )
+
+                    with col2:
+                        if st.button("📄 Prepare JSONL", use_container_width=True, help="Build the JSON Lines export"):
+                            st.session_state["_json_blob"] = build_action_items_jsonl(action_items, t_name, export_now.isoformat())
+                            st.session_state["_json_blob_key"] = board_key
+                        if st.session_state.get("_json_blob_key") == board_key:
+                            st.download_button(
+                                "📄 Export JSONL",
+                                data=st.session_state["_json_blob"],
+                                file_name=f"action_items_{export_ts}.jsonl",
+                                mime="application/x-ndjson",
+                                use_container_width=True,
+                                help="Download complete data as JSON Lines"
+                            )
                 
-                with col1:
-                    # Quick CSV Export
-                    csv_data = []
-                    for status, items in action_items.items():
-                        for item in items:
-                            csv_data.append({
-                                'id': item['id'],
-                                'task': item['task'],
-                                'assignee': item['assignee'],
-                                'deadline': item['deadline'],
-                                'priority': item['priority'],
-                                'context': item['context'],
-                                'status': status,
-                                'created_date': datetime.now().isoformat()
-                            })
-                    
-                    if csv_data:
-                        df = pd.DataFrame(csv_data)
-                        csv_string = df.to_csv(index=False)
-                        st.download_button(
-                            "📊 Export CSV",
-                            data=csv_string,
-                            file_name=f"action_items_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv",
-                            use_container_width=True,
-                            help="Download all action items as CSV"
-                        )
+                    with col3:
+                        # Clear all action items
+                        if st.button("🗑️ Clear All", use_container_width=True, type="secondary"):
+                            had_items = any(st.session_state[ACTION_ITEMS_KEY].values())
+                            st.session_state[ACTION_ITEMS_KEY] = {s: {} for s in _STATUSES}
+                            if had_items:
+                                # The result is always the same header-only file, so write
+                                # the pre-baked bytes instead of running the serializer
+                                try:
+                                    with open(CSV_FILE_PATH, 'wb') as f:
+                                        f.write(_EMPTY_CSV)
+                                except OSError:
+                                    st.session_state["_dirty"] = True
+                            st.success("✅ All action items cleared!")
+                            st.rerun()
                 
-                with col2:
-                    # JSON Export
-                    export_data = {
-                        "meeting_info": {
-                            "transcript_name": t_name,
-                            "extraction_date": datetime.now().isoformat(),
-                            "total_items": sum(len(items) for items in action_items.values())
-                        },
-                        "action_items": action_items
-                    }
-                    st.download_button(
-                        "📄 Export JSON",
-                        data=json.dumps(export_data, indent=2),
-                        file_name=f"action_items_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json",
-                        use_container_width=True,
-                        help="Download complete data as JSON"
+                @st.fragment
+                def render_import_panel():
+                    """CSV import; merges run an app-scoped rerun to refresh the board"""
+                    st.markdown("#### 📁 Import Action Items")
+                    uploaded_file = st.file_uploader(
+                        "Upload CSV file to import action items", 
+                        type=['csv'], 
+                        help="Upload a CSV file with columns: task, assignee, deadline, priority, context, status"
                     )
-                
-                with col3:
-                    # Clear all action items
-                    if st.button("🗑️ Clear All", use_container_width=True, type="secondary"):
-                        st.session_state[ACTION_ITEMS_KEY] = {"todo": [], "in_progress": [], "done": []}
-                        save_action_items_to_csv(st.session_state[ACTION_ITEMS_KEY])
-                        st.success("✅ All action items cleared!")
-                        st.rerun()
-                
-                # Import section
-                st.markdown("#### 📁 Import Action Items")
-                uploaded_file = st.file_uploader(
-                    "Upload CSV file to import action items", 
-                    type=['csv'], 
-                    help="Upload a CSV file with columns: task, assignee, deadline, priority, context, status"
-                )
-                if uploaded_file is not None:
-                    try:
-                        df = pd.read_csv(uploaded_file)
-                        imported_items = {"todo": [], "in_progress": [], "done": []}
-                        
-                        for _, row in df.iterrows():
-                            item = {
-                                'id': str(uuid.uuid4()),  # Generate new ID to avoid conflicts
-                                'task': row['task'],
-                                'assignee': row['assignee'],
-                                'deadline': row['deadline'],
-                                'priority': row['priority'],
-                                'context': row['context']
-                            }
-                            status = row['status']
-                            if status in imported_items:
-                                imported_items[status].append(item)
-                        
-                        # Merge with existing items
-                        for status in imported_items:
-                            st.session_state[ACTION_ITEMS_KEY][status].extend(imported_items[status])
-                        
-                        save_action_items_to_csv(st.session_state[ACTION_ITEMS_KEY])
-                        st.success(f"✅ Imported {sum(len(items) for items in imported_items.values())} action items!")
-                        st.rerun()
+                    if uploaded_file is not None:
+                        try:
+                            # Uploads here are a single meeting's items, so one
+                            # read of the whole file beats chunked buffered
+                            # parsing. Parse via StringIO, not splitlines():
+                            # the reader needs the newlines inside quoted
+                            # fields (multi-line context values) preserved.
+                            raw = uploaded_file.getvalue().decode('utf-8')
+                            rows = csv.reader(io.StringIO(raw, newline=''))
+                            header = next(rows, [])
+                            idx = {name: header.index(name) for name in
+                                   ('task', 'assignee', 'deadline', 'priority', 'context', 'status')}
+                            imported_items = {s: {} for s in _STATUSES}
+                            imported_count = 0
+
+                            for fields in rows:
+                                status = fields[idx['status']]
+                                if status not in _STATUS_SET:
+                                    continue
+                                # Fresh ID avoids conflicts; .hex skips the hyphen formatting
+                                item_id = uuid.uuid4().hex
+                                imported_items[status][item_id] = {
+                                    'id': item_id,
+                                    **{k: fields[idx[k]] for k in ('task', 'assignee', 'deadline', 'priority', 'context')},
+                                }
+                                imported_count += 1
+                            if imported_count:
+                                # Merge with existing items
+                                for status in imported_items:
+                                    st.session_state[ACTION_ITEMS_KEY][status].update(imported_items[status])
+
+                                st.session_state["_dirty"] = True
+                                st.success(f"✅ Imported {imported_count} action items!")
+                                st.rerun()
+                            else:
+                                st.warning("⚠️ No action items found in the uploaded CSV.")
                         
-                    except Exception as e:
-                        st.error(f"❌ Error importing CSV: {str(e)}")
+                        except Exception as e:
+                            st.error(f"❌ Error importing CSV: {str(e)}")
+
+                st.markdown("---")
+                render_export_panel(action_items, t_name)
+                render_import_panel()
 else:
     # Empty state with better visual design
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.markdown("""
-        <div style="text-align: center; padding: 2rem; color: #666;">
-            <h3 style="color: #999; margin-bottom: 1rem;">🔍 Ready to Analyze Your Meeting?</h3>
-            <p style="font-size: 1.1rem; margin-bottom: 0;">Search for a meeting above to view transcripts and extract action items</p>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_EMPTY_STATE_HTML, unsafe_allow_html=True)
 
 # ----------------------------
 # Footer
 # ----------------------------
 st.markdown("---")
-st.markdown("""
-<div style="text-align: center; padding: 1rem; color: #666; font-size: 0.9rem;">
-    <p style="margin: 0;">ℹ️ Transcripts are available only if the host enabled transcription and your account has permission to view the artifact.</p>
-    <p style="margin: 0.5rem 0 0 0;">🔒 This app uses read-only Meet scopes • No meeting bot required • Secure OAuth authentication</p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
+
+# ----------------------------
+# Deferred persistence
+# ----------------------------
+# Mutations only mark the board dirty; this single flush coalesces any number
+# of changes from the rerun into one CSV rewrite. The dirty bit lives in
+# session state, so a run cut short by st.rerun() flushes on the next pass.
+# A membership hash guards against no-op saves; every path that writes the
+# CSV (this flush and the append helper) refreshes it.
+if st.session_state.get("_dirty") and ACTION_ITEMS_KEY in st.session_state:
+    board = st.session_state[ACTION_ITEMS_KEY]
+    items_hash = _board_hash(board)
+    if items_hash == st.session_state.get("_items_hash"):
+        st.session_state["_dirty"] = False
+    elif save_action_items_to_csv(board):
+        st.session_state["_items_hash"] = items_hash
+        st.session_state["_dirty"] = False